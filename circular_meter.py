@@ -21,6 +21,8 @@ import PySimpleGUI as sg
 GRAPH_SIZE = (300 , 300)          # this one setting drives the other settings
 
 class CircularMeter():
+    DEGREES_PER_PERCENT = 3.6
+
     def __init__(
         self,
         graph: sg.Element,
@@ -41,23 +43,31 @@ class CircularMeter():
         self.text_color = text_color
         self.text_height = text_height
         self.text_location = (self.size[0]// 2, self.size[1] // 2)
+        self.arc_id = None
+        self.text_id = None
 
         self.update(init_percent)
 
     def update(self, percent_completed):
-        self.graph.erase()
-        arc_length = percent_completed/100*360+.9
-        if arc_length >= 360:
-            arc_length = 359.9
-        self.graph.draw_arc(
-            (self.circle_line_width, self.size[1] - self.circle_line_width), 
-            (self.size[0] - self.circle_line_width, self.circle_line_width),
-            arc_length, 0, 'arc', arc_color=self.circle_line_color, line_width=self.circle_line_width)
-        self.current_percent = percent_completed
-        self.graph.draw_text(
-            f'{self.current_percent:.1f}%', 
-            self.text_location, 
-            font=(self.text_font, -self.text_height), color=self.text_color)
+        # clamp once so callers passing <0 or >100 can't produce a bogus arc or label
+        p = max(0.0, min(100.0, percent_completed))
+        arc_length = min(359.9, p * self.DEGREES_PER_PERCENT + .9)
+        self.current_percent = p
+        text = f'{self.current_percent:.1f}%'
+        if self.arc_id is None:
+            # first call: create the canvas items once, later calls only reconfigure them
+            self.graph.erase()
+            self.arc_id = self.graph.draw_arc(
+                (self.circle_line_width, self.size[1] - self.circle_line_width), 
+                (self.size[0] - self.circle_line_width, self.circle_line_width),
+                arc_length, 0, 'arc', arc_color=self.circle_line_color, line_width=self.circle_line_width)
+            self.text_id = self.graph.draw_text(
+                text, 
+                self.text_location, 
+                font=(self.text_font, -self.text_height), color=self.text_color)
+        else:
+            self.graph.TKCanvas.itemconfig(self.arc_id, extent=arc_length)
+            self.graph.TKCanvas.itemconfig(self.text_id, text=text)
     
 
 def main():
@@ -5,7 +5,8 @@ remote_client = RemoteClient(
     username="tai", 
     password=None, 
     ssh_key_filepath=None, 
-    ssh_config_filepath="~/.ssh/config")
+    ssh_config_filepath="~/.ssh/config",
+    compress=False)
 remote_client.connect()
 remote_client.download(
     remote_path="/media/nas2/Tai/4-deepfake-data/output",
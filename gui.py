@@ -1,46 +1,145 @@
+import concurrent.futures
+import csv
+import functools
 import os
+import queue
 import re
 import threading
+import time
 
 # don't move the order
 _ = 0
-import torch
+# torch is only needed by the face detector, which is disabled; import it here again when re-enabling it
+# import torch
 # from retinaface.pre_trained_models import get_model
 
 _ = 0
 # don't move the order
 
-import cv2
 import decord
-import pandas as pd
 import pyperclip
 import PySimpleGUI as sg
 from PIL import Image, ImageTk
-import matplotlib.pyplot as plt 
 import numpy as np
-import io
 
 VIDEO_EXTS = "mp4"
 FRAME_DISPLAY_SIZE = (480, 270)
 SAMPLE_EVERY_N_FRAME = 3
 MAX_N_FRAMES_IN_BUFFER = 500
+DECODE_THREADS = 0  # 0 lets ffmpeg use one decode thread per core
+DECODE_CHUNK_SIZE = 64
+MAX_SCAN_WORKERS = 16
+FILTER_DEBOUNCE_S = 0.15
+FILE_LIST_BATCH_SIZE = 500
+SLIDER_COPY_DELAY_S = 0.25
+# keep buffered frames as 16-bit RGB565 instead of RGB24, a third less memory for a bit of colour banding
+STORE_FRAMES_AS_RGB565 = True
+# <celeb name>_<youtube id>_<first frame>_<last frame>.mp4
+CLIP_NAME_RE = re.compile(r"([^0-9_]+)_(.+)_(\d+)_(\d+)\.mp4$")
+_gpu_decode_ok = None  # None until the first load tries NVDEC, then whether it worked
+# the loader calls .asnumpy() on decoded batches, which only the native bridge returns
+decord.bridge.set_bridge("native")
 # FACE_DETECTOR = get_model("resnet50_2020-07-20", max_size=2048, device="cuda")
 # FACE_DETECTOR.eval()
 
 
-def get_all_files(path, prefix="", suffix="", contains=("",), excludes=("",)):
+def _scan_dir(path):
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                else:
+                    files.append(entry)
+    except OSError:
+        # unreadable directories are skipped, like os.walk does
+        pass
+    return files, dirs
+
+
+def _scan(path, should_stop=None):
+    # listing a directory is latency bound on network shares (the clips live on a NAS), so every
+    # subdirectory is listed on a thread pool as soon as its parent has been read.
+    # should_stop is checked per directory, so an abandoned scan stops even where nothing matches
+    def scan_dir(d):
+        if should_stop is not None and should_stop():
+            return [], []
+        return _scan_dir(d)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_SCAN_WORKERS) as executor:
+        pending = {executor.submit(scan_dir, path)}
+        try:
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                if should_stop is not None and should_stop():
+                    return
+                for future in done:
+                    files, dirs = future.result()
+                    pending.update(executor.submit(scan_dir, d) for d in dirs)
+                    yield from files
+        finally:
+            # a closed generator (abandoned scan) lists nothing more than the directories already running
+            for future in pending:
+                future.cancel()
+
+
+def _open_video_reader(path, width, height):
+    # prefer NVDEC so H.264 decode and resize run on the GPU, falling back to ffmpeg on the CPU when decord
+    # was built without CUDA. A failed GPU attempt is remembered so later loads go straight to the CPU.
+    global _gpu_decode_ok
+    if _gpu_decode_ok is not False:
+        try:
+            vr = decord.VideoReader(path, ctx=decord.gpu(0), width=width, height=height)
+            _gpu_decode_ok = True
+            return vr
+        except Exception as E:
+            if not _gpu_decode_ok:
+                print(f"[WARN]: GPU decode unavailable, using CPU: {E}")
+                _gpu_decode_ok = False
+    return decord.VideoReader(path, ctx=decord.cpu(0), width=width, height=height, num_threads=DECODE_THREADS)
+
+
+def _iter_matching_files(path, prefix, suffix, contains, excludes, should_stop):
+    # each substring list becomes one alternation regex, so a name is tested with a single C-level search
+    contains_re = None if "" in contains else re.compile("|".join(map(re.escape, contains)))
+    excludes_re = None if excludes == ("",) else re.compile("|".join(map(re.escape, excludes)))
+    for entry in _scan(path, should_stop):
+        name = entry.name
+        if prefix and not name.startswith(prefix):
+            continue
+        if suffix and not name.endswith(suffix):
+            continue
+        if contains_re is not None and not contains_re.search(name):
+            continue
+        if excludes_re is not None and excludes_re.search(name):
+            continue
+        yield entry.path
+
+
+def _pack_rgb565(frames):
+    # red in the top bits, stored little endian: the layout Pillow's "BGR;16" raw decoder reads back
+    frames = frames.astype("<u2")
+    return ((frames[..., 0] & 0xF8) << 8) | ((frames[..., 1] & 0xFC) << 3) | (frames[..., 2] >> 3)
+
+
+def iter_all_files(path, prefix="", suffix="", contains=("",), excludes=("",), should_stop=None):
+    # not a generator itself, so a bad path raises here rather than on the first next()
     if not os.path.isdir(path):
         raise ValueError(f"{path} is not a valid directory.")
-    files = []
-    for pre, dirs, basenames in os.walk(path):
-        for name in basenames:
-            if name.startswith(prefix) and name.endswith(suffix) and any([c in name for c in contains]):
-                if excludes == ("",):
-                    files.append(os.path.join(pre, name))
-                else:
-                    if all([e not in name for e in excludes]):
-                        files.append(os.path.join(pre, name))
-    return files
+    return _iter_matching_files(path, prefix, suffix, contains, excludes, should_stop)
+
+
+def get_all_files(path, prefix="", suffix="", contains=("",), excludes=("",)):
+    return list(iter_all_files(path, prefix, suffix, contains, excludes))
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_filter_terms(filter_str):
+    terms = [t.strip() for t in filter_str.split(",") if t.strip()]
+    return re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
 
 
 class ClipAnnotationGUI:
@@ -100,13 +199,41 @@ class ClipAnnotationGUI:
         self.window["-ANNO_CHOP_END-"].bind("<Button-1>", "-CLEAR_FIELD-")
 
         self.full_file_list = []
-        self.video_cap = None
+        self.set_file_arrays()
+        self._filter_deadline = None
+        self._copy_deadline = None
+        self._scan_id = 0
         self.video_res = None
         self.video_yt_id = None
         self.video_frame_range = None
         self.video_buffer = None
         self.video_buffer_idx = None
-        self.annotation_file = None
+        # decoded chunks handed from the loader thread to the event loop
+        self._frame_q = queue.Queue(maxsize=4)
+        self._convert_q = queue.Queue(maxsize=1)
+        self._photo = None
+        self._requested_frame_idx = None
+        threading.Thread(target=self.convert_worker, daemon=True).start()
+        self._n_frames_loaded = 0
+        self._load_pct = 0
+        # allocated once and reused by every load; video_buffer is a view into it
+        if STORE_FRAMES_AS_RGB565:
+            self._frame_ring = np.empty(
+                (MAX_N_FRAMES_IN_BUFFER, FRAME_DISPLAY_SIZE[1], FRAME_DISPLAY_SIZE[0]), dtype="<u2"
+            )
+        else:
+            self._frame_ring = np.empty(
+                (MAX_N_FRAMES_IN_BUFFER, FRAME_DISPLAY_SIZE[1], FRAME_DISPLAY_SIZE[0], 3), dtype=np.uint8
+            )
+        self.anno_index = None
+        # set when a replace left superseded rows in this file, dropped by rewriting it from anno_index
+        self._anno_dirty_path = None
+        self._anno_fp = None
+        self._anno_writer = None
+        # background rewrite started by a replace, see start_annotation_rewrite
+        self._rewrite_thread = None
+        self._rewrite_ok = False
+        self._anno_loading_path = None
         self.annokey_to_elmkey = {
             "file_name": "-ANNO_FILE_NAME-",
             "celeb_name": "-ANNO_CELEB_NAME-",
@@ -119,6 +246,10 @@ class ClipAnnotationGUI:
             "chop_begin": "-ANNO_CHOP_BEGIN-",
             "chop_end": "-ANNO_CHOP_END-",
         }
+        # the field -> element mapping never changes, so bind each element's update method once
+        self._field_updaters = [
+            (k, self.window[elmkey].update) for k, elmkey in self.annokey_to_elmkey.items()
+        ]
         self.annos = None
         self.current_anno = None
         self.anno_idx = 0
@@ -130,55 +261,128 @@ class ClipAnnotationGUI:
             except KeyboardInterrupt:
                 break
 
-            # run with a timeout so that current location can be updated
-            self.event, self.values = self.window.read()
+            # the loader thread wakes the loop up through write_event_value, so block until the next event,
+            # or only until a pending file list filter or clipboard copy is due
+            timeout = None
+            deadlines = [d for d in (self._filter_deadline, self._copy_deadline) if d is not None]
+            if deadlines:
+                timeout = max(0, int((min(deadlines) - time.monotonic()) * 1000))
+            self.event, self.values = self.window.read(timeout=timeout)
             if self.event == sg.WIN_CLOSED:
                 break
+            if self._filter_deadline is not None and time.monotonic() >= self._filter_deadline:
+                self._filter_deadline = None
+                self.filter_file_list()
+            if self._copy_deadline is not None and time.monotonic() >= self._copy_deadline:
+                self._copy_deadline = None
+                pyperclip.copy(self.window["-SLIDER_VALUE-"].get())
 
             if self.event == "-FOLDER_LOCATION-":
-                try:
-                    file_list = get_all_files(self.values["-FOLDER_LOCATION-"], suffix=VIDEO_EXTS)
-                except Exception as E:
-                    print(f"[Error]: {E}")
-                    file_list = []
-                self.full_file_list = sorted(file_list)
+                # a newer scan id makes batches still arriving from an older scan get dropped
+                self._scan_id += 1
+                self.full_file_list = []
+                self.set_file_arrays()
                 self.window["-FILE_LIST-"].update(self.full_file_list)
+                threading.Thread(
+                    target=self.scan_folder_worker,
+                    args=(self.values["-FOLDER_LOCATION-"], self._scan_id),
+                    daemon=True,
+                ).start()
+
+            elif self.event == "-FILES_BATCH-":
+                scan_id, files, done = self.values["-FILES_BATCH-"]
+                if scan_id != self._scan_id:
+                    continue
+                self.full_file_list.extend(files)
+                if done:
+                    self.full_file_list.sort()
+                # the arrays are rebuilt per batch so a filter typed mid-scan sees the files listed so far;
+                # batches grow geometrically, so this stays O(n) over the whole scan
+                self.set_file_arrays()
+                # shows the listing so far, or whatever was typed into the filter in the meantime
+                self.filter_file_list()
+                if self.anno_index is not None:
+                    # refilling the list box drops the colours, and the annotations may have loaded mid-scan
+                    self.highlight_annotated_files()
 
-            elif self.event == "-FILTER_FILE_LIST-" or self.event == "-FILTER_FILE_LIST_BTN-":
-                filter_str = self.values["-FILTER_FILE_LIST-"]
-                if filter_str is None:
-                    filter_str = ""
-                filtered_list = sorted(list(filter(lambda s: filter_str in s, self.full_file_list)))
-                self.window["-FILE_LIST-"].update(filtered_list)
+            elif self.event == "-FILTER_FILE_LIST-":
+                # typing restarts the wait, the list is only filtered once the keystrokes pause
+                self._filter_deadline = time.monotonic() + FILTER_DEBOUNCE_S
+
+            elif self.event == "-FILTER_FILE_LIST_BTN-":
+                self._filter_deadline = None
+                self.filter_file_list()
 
             elif self.event == "-FILE_LIST-" and len(self.values["-FILE_LIST-"]) > 0:
                 self.window["-VIDEO_PATH-"].update(self.values["-FILE_LIST-"][0])
                 self.window["-ANNO_SUBMIT_REPLACE-"].update(False)
-                if self.annotation_file is not None:
+                if self.anno_index is not None:
                     self.load_annotation_entry(self.values["-FILE_LIST-"][0])
 
             elif self.event == "-LOAD_VIDEO_BTN-":
-                threading.Thread(target=self.load_video_into_buffer, daemon=True).start()
+                self.window["-VIDEO_SLIDER-"].update(disabled=True)
+                self.window["-LOAD_VIDEO_BTN-"].update(disabled=True)
+                self.set_load_progress(0.0)
+                threading.Thread(
+                    target=self.load_video_worker, args=(self.values["-VIDEO_PATH-"],), daemon=True
+                ).start()
+
+            elif self.event == "-VIDEO_OPENED-":
+                self.video_res, self.video_buffer_idx = self.values["-VIDEO_OPENED-"]
+                self.video_buffer = self._frame_ring[: len(self.video_buffer_idx)]
+                self._n_frames_loaded = 0
+                self.window[self.annokey_to_elmkey["res_w"]].update(f"{self.video_res[0]}")
+                self.window[self.annokey_to_elmkey["res_h"]].update(f"{self.video_res[1]}")
+                self.set_load_progress(30.0)
+
+            elif self.event == "-FRAME_READY-":
+                self.drain_frame_queue()
 
             elif self.event == "-VIDEO_SLIDER-":
-                if self.video_cap is None or self.video_buffer is None or len(self.video_buffer) == 0:
+                if self.video_buffer is None or len(self.video_buffer) == 0:
                     continue
                 frame_idx = int(self.values["-VIDEO_SLIDER-"])
-                self.window["-FRAME_DISPLAY-"].update(
-                    data=ImageTk.PhotoImage(image=Image.fromarray(self.video_buffer[frame_idx]))
-                )
+                self.request_frame(frame_idx)
                 self.window["-SLIDER_VALUE-"].update(f"{self.video_buffer_idx[frame_idx]}")
-                pyperclip.copy(self.window["-SLIDER_VALUE-"].get())
+                # pyperclip shells out to xclip/pbcopy, so copy once the slider has settled, not on every tick
+                self._copy_deadline = time.monotonic() + SLIDER_COPY_DELAY_S
+
+            elif self.event == "-FRAME_CONVERTED-":
+                # only the PhotoImage has to be built here, Tk objects belong to the GUI thread
+                frame_idx, image = self.values["-FRAME_CONVERTED-"]
+                if frame_idx != self._requested_frame_idx:
+                    # the slider has moved on since this frame was requested, a newer one is on its way
+                    continue
+                if self._photo is None:
+                    self._photo = ImageTk.PhotoImage(image=image)
+                    self.window["-FRAME_DISPLAY-"].update(data=self._photo)
+                else:
+                    # every frame has the display size, so the one Tk image is overwritten in place
+                    self._photo.paste(image)
 
             elif self.event == "-ANNOTATION_FILE_LOC-":
-                try:
-                    self.print_anno_log(
-                        f"[INFO]: Trying to open annotation file at {self.values['-ANNOTATION_FILE_LOC-']}"
-                    )
-                    self.annotation_file = pd.read_csv(self.values["-ANNOTATION_FILE_LOC-"])
-                except:
+                self.consolidate_annotation_file()
+                self.print_anno_log(
+                    f"[INFO]: Trying to open annotation file at {self.values['-ANNOTATION_FILE_LOC-']}"
+                )
+                self.start_annotation_load(self.values["-ANNOTATION_FILE_LOC-"])
+
+            elif self.event == "-ANNO_LOADED-":
+                path, anno_index, is_reload = self.values["-ANNO_LOADED-"]
+                if path != self._anno_loading_path:
+                    # a different file was picked while this one was being read
+                    continue
+                self._anno_loading_path = None
+                self.window["-ANNO_SUBMIT_BTN-"].update(disabled=False)
+                if anno_index is None:
+                    if is_reload:
+                        self.print_anno_log(f"[ERROR]: Error reloading annotation file at {path}")
+                        continue
                     # create an annotation file
                     fpath = os.path.abspath("./annotations.csv")
+                    if path == fpath:
+                        self.print_anno_log(f"[ERROR]: Error opening annotation file at {fpath}")
+                        continue
                     self.print_anno_log(
                         f"[ERROR]: Error opening annotation file. "
                         + f"Creating new annotation file with header at {fpath}"
@@ -192,75 +396,50 @@ class ClipAnnotationGUI:
                         self.print_anno_log(
                             f"[ERROR]: Can't overwrite new annotation file at {fpath} because it exists there"
                         )
-                    self.annotation_file = pd.read_csv(fpath)
-                if self.values["-VIDEO_PATH-"] != "":
+                    self.start_annotation_load(fpath)
+                    continue
+
+                self.anno_index = anno_index
+                if is_reload:
+                    self.print_celeb_frame_totals()
+                elif self.values["-VIDEO_PATH-"] != "":
                     self.load_annotation_entry()
 
-                for i, video_file_path in enumerate(self.window["-FILE_LIST-"].get_list_values()):
-                    if os.path.split(video_file_path)[1] in self.annotation_file["file_name"].to_list():
-                        self.window["-FILE_LIST-"].Widget.itemconfig(i, bg="green", fg="white")
+                self.highlight_annotated_files()
 
             elif self.event == "-ANNO_SUBMIT_BTN-" and self.current_anno is not None:
                 is_annotation_good = True
-                for k in self.current_anno:
-                    v = self.values[self.annokey_to_elmkey[k]]
+                for k, elmkey in self.annokey_to_elmkey.items():
+                    v = self.values[elmkey]
                     self.current_anno[k] = v
                     if v is None or v == "":
                         self.print_anno_log(f'[ERROR]: Key {k} cannot have None or "" value.')
                         is_annotation_good = False
                         break
                 if is_annotation_good:
+                    anno = dict(self.current_anno)
                     if self.values["-ANNO_SUBMIT_REPLACE-"]:
-                        self.annotation_file = self.annotation_file.drop(
-                            self.annotation_file[
-                                self.annotation_file["file_name"] == self.current_anno["file_name"]
-                            ].index
-                        )
-                    self.annotation_file = pd.concat(
-                        [
-                            self.annotation_file,
-                            pd.DataFrame(
-                                [self.current_anno.values()], columns=list(self.current_anno.keys())
-                            ),
-                        ],
-                    ).reset_index(drop=True)
-                    # self.annotation_file = self.annotation_file.sort_values(by="file_name")
-                    self.annotation_file.to_csv(self.values["-ANNOTATION_FILE_LOC-"], index=False)
+                        # the superseded rows stay in the file until it is consolidated from the index
+                        self.anno_index[anno["file_name"]] = [anno]
+                        self._anno_dirty_path = self.values["-ANNOTATION_FILE_LOC-"]
+                    else:
+                        self.anno_index.setdefault(anno["file_name"], []).append(anno)
+                    self.append_annotation(self.values["-ANNOTATION_FILE_LOC-"], anno)
                     self.print_anno_log(f"[SUCCESS]: Entry {list(self.current_anno.values())} submitted.")
+                    if self._anno_dirty_path is not None:
+                        self.start_annotation_rewrite(self._anno_dirty_path)
+
+            elif self.event == "-CSV_DONE-":
+                self.wait_for_annotation_rewrite()
 
             elif self.event == "-ANNO_NEXT_BTN-" and self.annos is not None:
                 if len(self.annos) > 0:
                     self.anno_idx = (self.anno_idx + 1) % len(self.annos)
                     self.populate_anno_to_gui()
 
-            elif self.event == "-ANNO_RELOAD_BTN-" and self.annotation_file is not None:
-                self.annotation_file = pd.read_csv(self.values["-ANNOTATION_FILE_LOC-"])
-                for celeb in self.annotation_file["celeb_name"].unique():
-                    celeb_annotations = self.annotation_file.query(f"`celeb_name` == '{celeb}'")
-
-                    total_num_pristine_frames = 0
-                    total_num_not_pristine_frames = 0
-                    for _, anno in celeb_annotations.iterrows():
-                        frame_range = anno["frame_range"]
-                        frame_begin, frame_end = map(int, frame_range.split("-"))
-                        chop_begin, chop_end = int(anno["chop_begin"]), int(anno["chop_end"])
-                        if chop_begin == -1:
-                            chop_begin = 0
-                        if chop_end == -1:
-                            chop_end = (frame_end - frame_begin)
-                        chop_range = chop_end - chop_begin
-
-                        if anno["is_pristine"] == 1:
-                            total_num_pristine_frames += chop_range
-                        else:
-                            total_num_not_pristine_frames += chop_range
-
-                    print(celeb, total_num_pristine_frames, total_num_not_pristine_frames)
-
-
-                for i, video_file_path in enumerate(self.window["-FILE_LIST-"].get_list_values()):
-                    if os.path.split(video_file_path)[1] in list(self.annotation_file["file_name"].unique()):
-                        self.window["-FILE_LIST-"].Widget.itemconfig(i, bg="green", fg="white")
+            elif self.event == "-ANNO_RELOAD_BTN-" and self.anno_index is not None:
+                self.consolidate_annotation_file()
+                self.start_annotation_load(self.values["-ANNOTATION_FILE_LOC-"], is_reload=True)
 
             elif self.event == "-ANNO_CHOP_BEGIN--CLEAR_FIELD-":
                 self.window["-ANNO_CHOP_BEGIN-"].update("")
@@ -286,78 +465,349 @@ class ClipAnnotationGUI:
                     
             #         self.window[f"-FACE_IMG_BTN_{i}-"].update(image_data=data)
 
+        self.consolidate_annotation_file()
+        self.close_annotation_writer()
         self.window.close()
 
+    def scan_folder_worker(self, path, scan_id):
+        # runs on the scan thread. Batches grow with the number of files already sent, so the list box,
+        # which is refilled on every batch, inserts O(n) rows over the whole scan instead of O(n^2)
+        batch, n_sent = [], 0
+        files = None
+        try:
+            def is_superseded():
+                # a newer scan started, e.g. while the folder path is still being typed
+                return scan_id != self._scan_id
+
+            files = iter_all_files(path, suffix=VIDEO_EXTS, should_stop=is_superseded)
+            for file_path in files:
+                if is_superseded():
+                    return
+                batch.append(file_path)
+                if len(batch) >= max(FILE_LIST_BATCH_SIZE, n_sent):
+                    self.window.write_event_value("-FILES_BATCH-", (scan_id, batch, False))
+                    n_sent += len(batch)
+                    batch = []
+        except Exception as E:
+            print(f"[Error]: {E}")
+        finally:
+            if files is not None:
+                files.close()
+            if scan_id == self._scan_id:
+                self.window.write_event_value("-FILES_BATCH-", (scan_id, batch, True))
+
+    def filter_file_list(self):
+        filter_str = self.values["-FILTER_FILE_LIST-"]
+        if filter_str is None:
+            filter_str = ""
+        filter_str = filter_str.lower()
+        if "," in filter_str:
+            # comma separated terms match any of them, in one regex pass per file
+            pattern = _compile_filter_terms(filter_str)
+            shown_idx = np.array(
+                [i for i, s in enumerate(self._file_arr.tolist()) if pattern.search(s)], dtype=np.intp
+            )
+        else:
+            # typing more characters only narrows the previous result, so rescan that instead
+            if self._last_filter and filter_str.startswith(self._last_filter):
+                source_idx = self._shown_idx
+            else:
+                source_idx = np.arange(len(self._file_arr))
+            shown_idx = source_idx[np.char.find(self._file_arr_lower[source_idx], filter_str) >= 0]
+        self._last_filter = filter_str
+        self._shown_idx = shown_idx
+        self.window["-FILE_LIST-"].update(self._file_arr[shown_idx].tolist())
+
+    def set_file_arrays(self):
+        # vectorized views of the folder listing, rebuilt per scan batch; base names are split off here
+        # so neither filtering nor highlighting has to touch the paths in a Python loop
+        self._file_arr = np.array(self.full_file_list, dtype=str)
+        self._file_arr_lower = np.char.lower(self._file_arr)
+        self._file_names = self._file_arr
+        if len(self._file_arr) > 0:
+            self._file_names = np.char.rpartition(self._file_arr, os.sep)[:, 2]
+        self._last_filter = ""
+        self._shown_idx = np.arange(len(self._file_arr))
+
+    def highlight_annotated_files(self):
+        annotated_names = np.array(list(self.anno_index), dtype=str)
+        is_annotated = np.isin(self._file_names[self._shown_idx], annotated_names)
+        rows = np.flatnonzero(is_annotated)
+        if len(rows) == 0:
+            return
+        # one Tcl loop recolours every row, instead of one Python -> Tcl round trip per itemconfig call
+        listbox = self.window["-FILE_LIST-"].Widget
+        listbox.tk.eval(
+            f"foreach i {{{' '.join(map(str, rows.tolist()))}}} "
+            f"{{{listbox} itemconfigure $i -background green -foreground white}}"
+        )
+
     def load_annotation_entry(self, path=None):
         path = path if path is not None else self.values["-VIDEO_PATH-"]
         self.video_file_name = os.path.split(path)[1]
         self.print_anno_log(f"[INFO]: Searching for the annotations for video {self.video_file_name}")
-        self.annos = self.annotation_file.loc[self.annotation_file["file_name"] == self.video_file_name]
+        self.annos = self.anno_index.get(self.video_file_name, [])
 
-        if self.annos is None or len(self.annos) == 0:
+        if len(self.annos) == 0:
             self.print_anno_log(
                 f"[WARN]: Annotation for {self.video_file_name} does not exists. Submit a new entry."
             )
+            name_match = CLIP_NAME_RE.search(self.video_file_name)
+            celeb_name, yt_id, frame_lobound, frame_upbound = name_match.groups()
+            res_w, res_h = self.video_res if self.video_res is not None else ("", "")
+            # prefill a new entry from the file name and write every field exactly once
             self.current_anno = {k: "" for k in self.annokey_to_elmkey}
-            for k in self.current_anno:
-                self.window[self.annokey_to_elmkey[k]].update(self.current_anno[k])
-
-            celeb_name, yt_id, frame_lobound, frame_upbound, _ = re.findall(
-                r"([^0-9_]+)_(.+)_(\d+)_(\d+)(.mp4$)", self.video_file_name
-            )[0]
-            self.window[self.annokey_to_elmkey["file_name"]].update(self.video_file_name)
-            self.window[self.annokey_to_elmkey["celeb_name"]].update(celeb_name)
-            self.window[self.annokey_to_elmkey["youtube_id"]].update(yt_id)
-            self.window[self.annokey_to_elmkey["frame_range"]].update(f"{frame_lobound}-{frame_upbound}")
-            self.window[self.annokey_to_elmkey["res_w"]].update(
-                f"{self.video_res[0] if self.video_res is not None else ''}"
-            )
-            self.window[self.annokey_to_elmkey["res_h"]].update(
-                f"{self.video_res[1] if self.video_res is not None else ''}"
+            self.current_anno.update(
+                file_name=self.video_file_name,
+                celeb_name=celeb_name,
+                youtube_id=yt_id,
+                frame_range=f"{frame_lobound}-{frame_upbound}",
+                res_w=f"{res_w}",
+                res_h=f"{res_h}",
+                chop_begin="-1",
+                chop_end="-1",
             )
-            self.window[self.annokey_to_elmkey["chop_begin"]].update("-1")
-            self.window[self.annokey_to_elmkey["chop_end"]].update("-1")
+            for k, update in self._field_updaters:
+                update(self.current_anno[k])
 
         else:
             self.populate_anno_to_gui()
 
     def populate_anno_to_gui(self):
-        anno_lines = list(self.annos.to_numpy())
-        if self.anno_idx >= len(anno_lines):
+        if self.anno_idx >= len(self.annos):
             self.anno_idx = 0
-        curr_anno_line = anno_lines[self.anno_idx] # extract line with idx=self.anno_idx from self.annos 
+        curr_anno = self.annos[self.anno_idx]
         self.print_anno_log(f"[INFO]: Annotation for {self.video_file_name} exists. Entry Loaded.")
-        self.current_anno = {k: v for k, v in zip(list(self.annokey_to_elmkey.keys()), curr_anno_line)}
-        for k in self.current_anno:
-            self.window[self.annokey_to_elmkey[k]].update(self.current_anno[k])
-
-    def load_video_into_buffer(self):
-        self.window["-VIDEO_SLIDER-"].update(disabled=True)
-        self.window["-LOAD_VIDEO_BTN-"].update(disabled=True)
-        self.video_cap = cv2.VideoCapture(self.values["-VIDEO_PATH-"])
-
-        self.video_res = (
-            self.video_cap.get(cv2.CAP_PROP_FRAME_WIDTH),
-            self.video_cap.get(cv2.CAP_PROP_FRAME_HEIGHT),
-        )
-        self.window[self.annokey_to_elmkey["res_w"]].update(f"{self.video_res[0]}")
-        self.window[self.annokey_to_elmkey["res_h"]].update(f"{self.video_res[1]}")
-        self.video_cap.release()
-        self.window["-VIDEO_LOAD_PROGRESS-"].update(30.0)
+        self.current_anno = {k: curr_anno[k] for k in self.annokey_to_elmkey}
+        for k, update in self._field_updaters:
+            update(self.current_anno[k])
 
-        vr = decord.VideoReader(
-            self.values["-VIDEO_PATH-"], width=FRAME_DISPLAY_SIZE[0], height=FRAME_DISPLAY_SIZE[1]
-        )
-        self.video_buffer_idx = list(range(0, len(vr), SAMPLE_EVERY_N_FRAME))
-        self.video_buffer = vr.get_batch(self.video_buffer_idx).asnumpy()
+    def load_video_worker(self, path):
+        load_ok = False
+        try:
+            self.load_video_into_buffer(path)
+            load_ok = True
+        except Exception as E:
+            print(f"[Error]: {E}")
+        finally:
+            # sentinel: tells the event loop that no more frames are coming, and whether the load succeeded
+            self._frame_q.put(load_ok)
+            self.window.write_event_value("-FRAME_READY-", None)
+
+    def load_video_into_buffer(self, path):
+        # runs on the loader thread: only decodes and hands frames over, never touches widgets
+        # decord has no size-only probe: open at native size and decode the first frame for its shape.
+        # floats keep the res fields formatted like they always were in the annotation file ("1920.0")
+        probe = decord.VideoReader(path, num_threads=1)
+        frame_h, frame_w, _ = probe[0].shape
+        video_res = (float(frame_w), float(frame_h))
+        del probe
+
+        vr = _open_video_reader(path, width=FRAME_DISPLAY_SIZE[0], height=FRAME_DISPLAY_SIZE[1])
+        # sample sparser on long videos so the frames always fit in the preallocated buffer
+        step = max(SAMPLE_EVERY_N_FRAME, -(-len(vr) // MAX_N_FRAMES_IN_BUFFER))
+        video_buffer_idx = np.arange(0, len(vr), step, dtype=np.int32)
+        self.window.write_event_value("-VIDEO_OPENED-", (video_res, video_buffer_idx))
+
+        for start in range(0, len(video_buffer_idx), DECODE_CHUNK_SIZE):
+            frames = vr.get_batch(video_buffer_idx[start : start + DECODE_CHUNK_SIZE]).asnumpy()
+            if STORE_FRAMES_AS_RGB565:
+                frames = _pack_rgb565(frames)
+            self._frame_q.put((start, frames))
+            self.window.write_event_value("-FRAME_READY-", None)
+
+    def drain_frame_queue(self):
+        n_loaded_before = self._n_frames_loaded
+        done = False
+        while True:
+            try:
+                item = self._frame_q.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, bool):
+                if not item:
+                    # whatever is buffered is either the previous video or a partial decode of this one
+                    self.fail_video_load()
+                    return
+                # a short clip can deliver its only chunk and the end marker in one drain; the first
+                # frame still has to be shown below before the load is finished
+                done = True
+                break
+            start, frames = item
+            self.video_buffer[start : start + len(frames)] = frames
+            self._n_frames_loaded += len(frames)
+        if n_loaded_before == self._n_frames_loaded:
+            if done:
+                self.finish_video_load()
+            return
+        # frames arrive in order, so the decoded prefix can be scrubbed while the rest is still loading
+        self.window["-VIDEO_SLIDER-"].update(disabled=False, range=(0, self._n_frames_loaded - 1))
+        if n_loaded_before == 0:
+            self.window["-VIDEO_SLIDER-"].update(value=0)
+            self.window["-SLIDER_VALUE-"].update(f"{self.video_buffer_idx[0]}")
+            self.request_frame(0)
+        # one progress bar update per drained batch rather than per chunk
+        self.set_load_progress(30.0 + 70.0 * self._n_frames_loaded / len(self.video_buffer))
+        if done:
+            self.finish_video_load()
 
-        self.window["-VIDEO_LOAD_PROGRESS-"].update(100.0)
+    def request_frame(self, frame_idx):
+        # a drag produces far more slider events than frames can be shown, so only the newest request is kept
+        try:
+            self._convert_q.get_nowait()
+        except queue.Empty:
+            pass
+        self._requested_frame_idx = frame_idx
+        self._convert_q.put((frame_idx, self.video_buffer[frame_idx]))
+
+    def convert_worker(self):
+        # runs on the converter thread: array -> PIL image, handed back to the event loop for display
+        while True:
+            frame_idx, frame = self._convert_q.get()
+            # frames are contiguous, so Pillow's raw decoder reads them as they are. For RGB565 it also
+            # expands the pixels to 8 bits per channel in the same C pass
+            rawmode = "BGR;16" if STORE_FRAMES_AS_RGB565 else "RGB"
+            image = Image.frombuffer("RGB", FRAME_DISPLAY_SIZE, frame, "raw", rawmode, 0, 1)
+            self.window.write_event_value("-FRAME_CONVERTED-", (frame_idx, image))
+
+    def set_load_progress(self, progress):
+        # the bar only has 100 steps, skip updates that would not move it
+        pct = int(progress)
+        if pct != self._load_pct:
+            self._load_pct = pct
+            self.window["-VIDEO_LOAD_PROGRESS-"].update(pct)
+
+    def finish_video_load(self):
         self.window["-LOAD_VIDEO_BTN-"].update(disabled=False)
-        self.window["-VIDEO_SLIDER-"].update(disabled=False, range=(0, len(self.video_buffer) - 1), value=0)
-        self.window["-SLIDER_VALUE-"].update("0")
-        self.window["-FRAME_DISPLAY-"].update(
-            data=ImageTk.PhotoImage(image=Image.fromarray(self.video_buffer[0]))
-        )
+        if self.video_buffer is None or self._n_frames_loaded == 0:
+            self.video_buffer = None
+            return
+        # keep only what was decoded if the loader stopped early
+        self.video_buffer = self.video_buffer[: self._n_frames_loaded]
+        self.video_buffer_idx = self.video_buffer_idx[: self._n_frames_loaded]
+        self.set_load_progress(100.0)
+        self.window["-VIDEO_SLIDER-"].update(disabled=False, range=(0, len(self.video_buffer) - 1))
+
+    def fail_video_load(self):
+        # nothing may be annotated against frames that don't belong to the video in -VIDEO_PATH-
+        self.video_buffer = None
+        self._n_frames_loaded = 0
+        self._requested_frame_idx = None
+        if self._photo is not None:
+            self._photo.paste(Image.new("RGB", FRAME_DISPLAY_SIZE, "green"))
+        self.set_load_progress(0.0)
+        self.window["-VIDEO_SLIDER-"].update(value=0, disabled=True)
+        self.window["-SLIDER_VALUE-"].update("")
+        self.window["-LOAD_VIDEO_BTN-"].update(disabled=False)
+
+    def start_annotation_load(self, path, is_reload=False):
+        # the file is parsed off the event loop; submits wait until its index is installed
+        self._anno_loading_path = path
+        self.window["-ANNO_SUBMIT_BTN-"].update(disabled=True)
+        threading.Thread(target=self.anno_load_worker, args=(path, is_reload), daemon=True).start()
+
+    def anno_load_worker(self, path, is_reload):
+        try:
+            anno_index = self.read_annotation_file(path)
+        except Exception as E:
+            print(f"[Error]: {E}")
+            anno_index = None
+        self.window.write_event_value("-ANNO_LOADED-", (path, anno_index, is_reload))
+
+    def print_celeb_frame_totals(self):
+        # celeb_name -> [total_num_pristine_frames, total_num_not_pristine_frames]
+        celeb_frame_totals = {}
+        for annos in self.anno_index.values():
+            for anno in annos:
+                frame_begin, frame_end = map(int, anno["frame_range"].split("-"))
+                chop_begin, chop_end = int(float(anno["chop_begin"])), int(float(anno["chop_end"]))
+                if chop_begin == -1:
+                    chop_begin = 0
+                if chop_end == -1:
+                    chop_end = (frame_end - frame_begin)
+                chop_range = chop_end - chop_begin
+
+                totals = celeb_frame_totals.setdefault(anno["celeb_name"], [0, 0])
+                if float(anno["is_pristine"]) == 1:
+                    totals[0] += chop_range
+                else:
+                    totals[1] += chop_range
+
+        for celeb, totals in celeb_frame_totals.items():
+            total_num_pristine_frames, total_num_not_pristine_frames = totals
+            print(celeb, total_num_pristine_frames, total_num_not_pristine_frames)
+
+    def read_annotation_file(self, path):
+        # file_name -> every entry for that video, in file order
+        anno_index = {}
+        with open(path, newline="") as f:
+            for anno in csv.DictReader(f):
+                anno_index.setdefault(anno["file_name"], []).append(anno)
+        return anno_index
+
+    def write_annotation_file(self, path):
+        self.close_annotation_writer()
+        self.write_annotation_rows(path, [anno for annos in self.anno_index.values() for anno in annos])
+
+    def write_annotation_rows(self, path, rows):
+        # written next to the target and swapped in, so a crash mid-write never leaves a truncated file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.annokey_to_elmkey)
+            for anno in rows:
+                writer.writerow([anno[k] for k in self.annokey_to_elmkey])
+        os.replace(tmp_path, path)
+
+    def start_annotation_rewrite(self, path):
+        # submits are held off until the rewrite is done, so no row gets appended to the file being replaced
+        self.close_annotation_writer()
+        self.window["-ANNO_SUBMIT_BTN-"].update(disabled=True)
+        rows = [anno for annos in self.anno_index.values() for anno in annos]
+        self._rewrite_thread = threading.Thread(target=self.rewrite_worker, args=(path, rows), daemon=True)
+        self._rewrite_thread.start()
+
+    def rewrite_worker(self, path, rows):
+        self._rewrite_ok = False
+        try:
+            self.write_annotation_rows(path, rows)
+            self._rewrite_ok = True
+        except Exception as E:
+            print(f"[Error]: {E}")
+        finally:
+            self.window.write_event_value("-CSV_DONE-", path)
+
+    def wait_for_annotation_rewrite(self):
+        if self._rewrite_thread is None:
+            return
+        self._rewrite_thread.join()
+        self._rewrite_thread = None
+        if self._rewrite_ok:
+            self._anno_dirty_path = None
+        self.window["-ANNO_SUBMIT_BTN-"].update(disabled=False)
+
+    def consolidate_annotation_file(self):
+        self.wait_for_annotation_rewrite()
+        if self._anno_dirty_path is not None:
+            self.write_annotation_file(self._anno_dirty_path)
+            self._anno_dirty_path = None
+
+    def append_annotation(self, path, anno):
+        # the file stays open in append mode between submits, flushed after every row so nothing is lost
+        if self._anno_fp is None or self._anno_fp.name != path:
+            self.close_annotation_writer()
+            self._anno_fp = open(path, "a", newline="")
+            self._anno_writer = csv.DictWriter(
+                self._anno_fp, fieldnames=list(self.annokey_to_elmkey), extrasaction="ignore"
+            )
+        self._anno_writer.writerow(anno)
+        self._anno_fp.flush()
+
+    def close_annotation_writer(self):
+        if self._anno_fp is not None:
+            self._anno_fp.close()
+            self._anno_fp = None
+            self._anno_writer = None
 
     def print_anno_log(self, message):
         if "[INFO]" in message:
@@ -294,7 +294,10 @@ class SCPClient(object):
         """return just the file stats needed for scp"""
         if os.name == 'nt':
             name = asunicode(name)
-        stats = os.stat(name)
+        return self._scp_stats(os.stat(name))
+
+    @staticmethod
+    def _scp_stats(stats):
         mode = oct(stats.st_mode)[-4:]
         size = stats.st_size
         atime = int(stats.st_atime)
@@ -303,12 +306,12 @@ class SCPClient(object):
 
     def _send_files(self, files):
         for name in files:
-            (mode, size, mtime, atime) = self._read_stats(name)
-            if self.preserve_times:
-                self._send_time(mtime, atime)
-            fl = open(name, 'rb')
-            self._send_file(fl, name, mode, size)
-            fl.close()
+            # fstat the open file instead of stat-ing the path and then opening it
+            with open(name, 'rb') as fl:
+                (mode, size, mtime, atime) = self._scp_stats(os.fstat(fl.fileno()))
+                if self.preserve_times:
+                    self._send_time(mtime, atime)
+                self._send_file(fl, name, mode, size)
 
     def _send_file(self, fl, name, mode, size):
         basename = asbytes(os.path.basename(name))
@@ -1,16 +1,52 @@
 """Client to handle connections and actions executed against a remote host."""
+import concurrent.futures
+import functools
 import logging
 import os
-import select
+import posixpath
+import re
+import selectors
+import shlex
+import socket
+import stat
+import threading
 from typing import *
 
-from paramiko import AutoAddPolicy, ProxyCommand, RSAKey, SSHClient, SSHConfig
+from paramiko import AutoAddPolicy, ProxyCommand, RSAKey, SFTPClient, SSHClient, SSHConfig
 from paramiko.auth_handler import AuthenticationException, SSHException
 
 from scp import SCPClient, SCPException
 
-STDOUT_TIMEOUT = 5
+STDOUT_TIMEOUT = 1.0
 CONNECTION_TIMEOUT = 5
+SCP_SOCKET_TIMEOUT = 30.0
+CMD_SENTINEL_NAME = "CMDEND"
+RECV_CHUNK_SIZE = 65536
+# remote paths the shell behind scp would rewrite (globs, variables, ~, quoting)
+_SHELL_EXPANDED_RE = re.compile(r"[*?\[\]{}$~`\\'\"]")
+# flow control for new channels: paramiko's defaults (2 MB window, 32 KB packets) stall bulk
+# transfers on every window refill over a high latency link
+SSH_WINDOW_SIZE = 16 * 1024 * 1024
+SSH_MAX_PACKET_SIZE = 256 * 1024
+SSH_KEEPALIVE_S = 30
+
+# SSH clients shared by every RemoteClient connecting to the same target, so the handshake and
+# authentication happen once per process: (hostname, port, username, key file, compress) -> SSHClient
+_POOL: Dict[tuple, SSHClient] = {}
+_POOL_REFS: Dict[tuple, int] = {}
+_POOL_LOCK = threading.Lock()
+# one lock per target, held while a new connection is made: clients for the same target wait for that
+# handshake instead of starting their own, while other targets connect concurrently
+_CONNECT_LOCKS: Dict[tuple, threading.Lock] = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_ssh_config(path: str) -> SSHConfig:
+    """Parse an ssh config file once per process; clients reading the same file share the result."""
+    ssh_config = SSHConfig()
+    with open(path, "r", encoding="utf-8") as f:
+        ssh_config.parse(f)
+    return ssh_config
 
 
 class RemoteClient:
@@ -25,13 +61,23 @@ class RemoteClient:
         ssh_key_filepath: Union[None, str] = None,
         ssh_config_filepath: Union[None, str] = None,
         logger: Union[None, logging.Logger] = None,
+        buff_size: int = 1024 * 1024,
+        compress: bool = True,
     ):
         self.hostname = hostname
         self.hostport = hostport
         self.username = username
         self.password = password
         self.ssh_key_filepath = ssh_key_filepath
+        self.buff_size = buff_size
+        # zlib on the transport; worth it for command output and text, not for already-compressed video
+        self.compress = compress
         self.client = None
+        self._pool_key = None
+        self._scp = None
+        self._sftp = None
+        # set once the server turned down the sftp subsystem, so single files go straight to scp
+        self._sftp_unavailable = False
         if logger is None:
             self.logger = logging.Logger("RemoteClientLogger", level="INFO")
         else:
@@ -41,41 +87,85 @@ class RemoteClient:
             self.ssh_key_filepath = os.path.expanduser("~/.ssh/id_rsa")
 
         if ssh_config_filepath is not None:
+            self.ssh_config = _parse_ssh_config(os.path.expanduser(ssh_config_filepath))
+        else:
             self.ssh_config = SSHConfig()
-            user_config_file = os.path.expanduser(ssh_config_filepath)
-            with open(user_config_file, "r", encoding="utf-8") as f:
-                self.ssh_config.parse(f)
-
-        # self._upload_ssh_key()
+        # connect() kwargs are merged with the ssh config host entry once, here, instead of on every
+        # connect; the template itself is never mutated
+        cfg = {
+            "hostname": self.hostname,
+            "port": self.hostport,
+            "username": self.username,
+            "password": self.password,
+            "key_filename": self.ssh_key_filepath,
+            "timeout": CONNECTION_TIMEOUT,
+            "compress": self.compress,
+        }
+        host_conf = self.ssh_config.lookup(self.hostname)
+        self._proxycommand = host_conf.get("proxycommand")
+        if "user" in host_conf:
+            cfg["username"] = host_conf["user"]
+        if "identityfile" in host_conf:
+            cfg["key_filename"] = host_conf["identityfile"]
+        if "hostname" in host_conf:
+            cfg["hostname"] = host_conf["hostname"]
+        if "port" in host_conf:
+            cfg["port"] = int(host_conf["port"])
+        self._cfg_template = cfg
+
+        key_filename = cfg["key_filename"]
+        if isinstance(key_filename, list):
+            key_filename = tuple(key_filename)
+        self._target_key = (cfg["hostname"], cfg["port"], cfg["username"], key_filename, self.compress)
+
+    @classmethod
+    def from_pool(cls, *args, **kwargs) -> "RemoteClient":
+        """Create a client and connect it, sharing the SSH connection of any other pooled client
+        for the same host, port, user and key. Takes the same arguments as RemoteClient."""
+        remote_client = cls(*args, **kwargs)
+        remote_client.connect()
+        return remote_client
 
     def connect(self):
-        """Open SSH connection to remote host."""
+        """Open SSH connection to remote host, or reuse a live pooled one to the same target."""
+        if self.client is not None:
+            self._release_client()
         try:
-            self.client = SSHClient()
-            self.client.load_system_host_keys()
-            self.client.set_missing_host_key_policy(AutoAddPolicy())
-
-            cfg = {
-                "hostname": self.hostname,
-                "port": self.hostport,
-                "username": self.username,
-                "password": self.password,
-                "key_filename": self.ssh_key_filepath,
-                "timeout": CONNECTION_TIMEOUT,
-            }
-            host_conf = self.ssh_config.lookup(self.hostname)
-            if host_conf:
-                if "proxycommand" in host_conf:
-                    cfg["sock"] = ProxyCommand(host_conf["proxycommand"])
-                if "user" in host_conf:
-                    cfg["username"] = host_conf["user"]
-                if "identityfile" in host_conf:
-                    cfg["key_filename"] = host_conf["identityfile"]
-                if "hostname" in host_conf:
-                    cfg["hostname"] = host_conf["hostname"]
-                if "port" in host_conf:
-                    cfg["port"] = int(host_conf["port"])
-            self.client.connect(**cfg)
+            pool_key = self._target_key
+            with _POOL_LOCK:
+                connect_lock = _CONNECT_LOCKS.setdefault(pool_key, threading.Lock())
+            with connect_lock:
+                with _POOL_LOCK:
+                    client = _POOL.get(pool_key)
+                    transport = client.get_transport() if client is not None else None
+                    if transport is not None and transport.is_active():
+                        _POOL_REFS[pool_key] += 1
+                    else:
+                        client = None
+                if client is None:
+                    # the handshake runs outside _POOL_LOCK, so a slow host holds up no other target
+                    cfg = self._cfg_template
+                    # the proxy process is only started when a new connection is actually needed
+                    if self._proxycommand is not None:
+                        cfg = {**cfg, "sock": ProxyCommand(self._proxycommand)}
+                    client = SSHClient()
+                    client.load_system_host_keys()
+                    client.set_missing_host_key_policy(AutoAddPolicy())
+                    client.connect(**cfg)
+                    transport = client.get_transport()
+                    transport.default_window_size = SSH_WINDOW_SIZE
+                    transport.default_max_packet_size = SSH_MAX_PACKET_SIZE
+                    transport.set_keepalive(SSH_KEEPALIVE_S)
+                    self._tune_socket(transport.sock)
+                    with _POOL_LOCK:
+                        _POOL[pool_key] = client
+                        _POOL_REFS[pool_key] = 1
+            self.client = client
+            self._pool_key = pool_key
+            # SCP/SFTP clients from a previous connection are bound to that connection's transport
+            self._scp = None
+            self._sftp = None
+            self._sftp_unavailable = False
         except AuthenticationException as e:
             self.logger.error(
                 f"AuthenticationException occurred; did you remember to generate an SSH key? {e}"
@@ -85,9 +175,44 @@ class RemoteClient:
             self.logger.error(f"Unexpected error occurred: {e}")
             raise e
 
+    @staticmethod
+    def _tune_socket(sock):
+        """Disable Nagle so small command echoes aren't delayed, and turn on TCP keepalive. The
+        buffer sizes are left to the kernel's autotuning, which fixed SO_SNDBUF/SO_RCVBUF would disable."""
+        # behind a ProxyCommand the transport talks to a subprocess pipe, not a TCP socket
+        if not isinstance(sock, socket.socket):
+            return
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+    def _release_client(self):
+        """Drop this client's reference to the pooled SSH connection, closing it if it was the last one."""
+        with _POOL_LOCK:
+            if _POOL.get(self._pool_key) is not self.client:
+                # the pool already replaced this connection after it died
+                self.client.close()
+            else:
+                _POOL_REFS[self._pool_key] -= 1
+                if _POOL_REFS[self._pool_key] == 0:
+                    del _POOL_REFS[self._pool_key]
+                    del _POOL[self._pool_key]
+                    self.client.close()
+        self.client = None
+        self._pool_key = None
+
     @property
     def scp(self) -> SCPClient:
-        return SCPClient(self.client.get_transport())
+        if self._scp is None:
+            self._scp = SCPClient(
+                self.client.get_transport(), buff_size=self.buff_size, socket_timeout=SCP_SOCKET_TIMEOUT
+            )
+        return self._scp
+
+    @property
+    def sftp(self) -> SFTPClient:
+        if self._sftp is None:
+            self._sftp = self.client.open_sftp()
+        return self._sftp
 
     def _get_ssh_key(self):
         """Fetch locally stored SSH key."""
@@ -102,10 +227,19 @@ class RemoteClient:
             raise e
 
     def _upload_ssh_key(self):
+        """Append the public key to the remote authorized_keys over the connected client, unless
+        it is already there. Unlike ssh-copy-id this needs no second SSH session, but connect() must
+        have been called first."""
         try:
-            os.system(
-                f"ssh-copy-id -i {self.ssh_key_filepath}.pub {self.username}@{self.hostname}>/dev/null 2>&1"
+            with open(f"{self.ssh_key_filepath}.pub", "r", encoding="utf-8") as f:
+                pub = shlex.quote(f.read().strip())
+            _, stderr, exit_code = self.safe_exec_cmd(
+                "mkdir -p ~/.ssh && chmod 700 ~/.ssh"
+                f" && {{ grep -qsxF {pub} ~/.ssh/authorized_keys || echo {pub} >> ~/.ssh/authorized_keys; }}"
+                " && chmod 600 ~/.ssh/authorized_keys"
             )
+            if exit_code != 0:
+                raise SSHException(f"Failed to upload {self.ssh_key_filepath}.pub: {stderr.strip()}")
             self.logger.info(f"{self.ssh_key_filepath} uploaded to {self.hostname}")
         except FileNotFoundError as error:
             self.logger.error(error)
@@ -115,10 +249,14 @@ class RemoteClient:
 
     def disconnect(self):
         """Close SSH & SCP connection."""
-        if self.connection:
-            self.client.close()
-        if self.scp:
-            self.scp.close()
+        if self._scp is not None:
+            self._scp.close()
+            self._scp = None
+        if self._sftp is not None:
+            self._sftp.close()
+            self._sftp = None
+        if self.client is not None:
+            self._release_client()
 
     def upload(
         self,
@@ -126,6 +264,7 @@ class RemoteClient:
         remote_path: str,
         recursive=False,
         preserve_times=False,
+        max_workers: int = 4,
     ):
         """Transfer files and directories to remote host.
 
@@ -137,55 +276,228 @@ class RemoteClient:
             recursive (bool, optional): transfer files and directories recursively. Defaults to False.
             preserve_times (bool, optional): preserve mtime and atime of transferred files
             and directories. Defaults to False.
+            max_workers (int, optional): number of SCP channels a list of paths is spread over.
+            Defaults to 4.
 
         Raises:
             e: SCPException
         """
+        files_list = [files] if isinstance(files, str) else list(files)
         try:
-            self.scp.put(files, remote_path, recursive, preserve_times)
+            if (
+                len(files_list) == 1
+                and not recursive
+                and not preserve_times
+                and os.path.isfile(files_list[0])
+                and not _SHELL_EXPANDED_RE.search(remote_path)
+            ):
+                # sftp takes paths literally, so anything scp's remote shell would expand stays on scp
+                if not self._sftp_put_one(files_list[0], remote_path):
+                    self.scp.put(files_list, remote_path, recursive, preserve_times)
+            elif len(files_list) > 1 and max_workers > 1:
+                self._parallel_scp("put", files_list, max_workers, remote_path, recursive, preserve_times)
+            else:
+                self.scp.put(files_list, remote_path, recursive, preserve_times)
             self.logger.info(
-                f"Finished uploading {len(files)} files to {remote_path} on {self.hostname}"
+                f"Finished uploading {len(files_list)} files to {remote_path} on {self.hostname}"
             )
         except SCPException as e:
             raise e
 
     def download(
         self,
-        remote_path: str,
+        remote_path: Union[str, List[str]],
         local_path: str = "",
         recursive=False,
         preserve_times=False,
+        max_workers: int = 4,
     ):
         """Transfer files and directories from remote host to localhost.
 
         Args:
-            remote_path (str): path to retrieve from remote host. since this is
-            evaluated by scp on the remote host, shell wildcards and
+            remote_path (Union[str, List[str]]): path, or list of paths, to retrieve from remote host.
+            since this is evaluated by scp on the remote host, shell wildcards and
             environment variables may be used.
             local_path (str, optional): path in which to receive files locally. Defaults to ''.
             recursive (bool, optional): transfer files and directories recursively. Defaults to False.
             preserve_times (bool, optional): preserve mtime and atime of transferred files
             and directories.. Defaults to False.
+            max_workers (int, optional): number of SCP channels a list of paths is spread over.
+            Defaults to 4.
 
         Raises:
             e: SCPException
         """
+        remote_list = [remote_path] if isinstance(remote_path, str) else list(remote_path)
         try:
-            self.scp.get(remote_path, local_path, recursive, preserve_times)
+            if (
+                len(remote_list) == 1
+                and not recursive
+                and not preserve_times
+                and not _SHELL_EXPANDED_RE.search(remote_list[0])
+            ):
+                # sftp does not expand wildcards, variables or ~, so only plain paths take this route
+                if not self._sftp_get_one(remote_list[0], local_path):
+                    self.scp.get(remote_list, local_path, recursive, preserve_times)
+            elif len(remote_list) > 1 and max_workers > 1:
+                # each share may hold a single path, which SCPClient.get would write to local_path itself
+                # when it is not a directory; check up front, as it does for a list
+                recv_dir = local_path or os.getcwd()
+                if not os.path.exists(recv_dir):
+                    raise SCPException(f"Local path '{recv_dir}' does not exist")
+                elif not os.path.isdir(recv_dir):
+                    raise SCPException(f"Local path '{recv_dir}' is not a directory")
+                self._parallel_scp("get", remote_list, max_workers, local_path, recursive, preserve_times)
+            else:
+                self.scp.get(remote_list, local_path, recursive, preserve_times)
             self.logger.info(
-                f"Finished downloading {remote_path} to {local_path} on {self.hostname}"
+                f"Finished downloading {len(remote_list)} paths to {local_path} from {self.hostname}"
             )
         except SCPException as e:
             raise e
 
-    def safe_exec_cmd(self, command: str) -> Tuple[str, int]:
+    def _sftp_put_one(self, file: str, remote_path: str) -> bool:
+        """Upload a lone file over SFTP, which skips the scp protocol handshake; confirm=False drops
+        the stat after the put. Returns False instead of raising when SFTP failed, so the caller can
+        retry over scp, which reports errors as SCPException."""
+        if self._sftp_unavailable:
+            return False
+        try:
+            target = remote_path
+            try:
+                if stat.S_ISDIR(self.sftp.stat(remote_path).st_mode):
+                    target = posixpath.join(remote_path, os.path.basename(file))
+            except IOError:
+                pass  # remote_path names the new file
+            self.sftp.put(file, target, confirm=False)
+            # scp sends the file mode, sftp creates the file with the server's default one
+            self.sftp.chmod(target, stat.S_IMODE(os.stat(file).st_mode))
+            return True
+        except (IOError, SSHException) as e:
+            self._sftp_unavailable = self._sftp is None
+            self.logger.info(f"SFTP upload of {file} failed, retrying over SCP: {e}")
+            return False
+
+    def _sftp_get_one(self, remote_file: str, local_path: str) -> bool:
+        """Download a lone file over SFTP. Returns False instead of raising when SFTP failed, so the
+        caller can retry over scp, which reports errors as SCPException."""
+        if self._sftp_unavailable:
+            return False
+        target = local_path
+        if local_path == "" or os.path.isdir(local_path):
+            target = os.path.join(local_path, posixpath.basename(remote_file))
+        try:
+            mode = stat.S_IMODE(self.sftp.stat(remote_file).st_mode)
+            self.sftp.get(remote_file, target)
+            # scp applies the remote file mode to the local copy, sftp.get does not
+            os.chmod(target, mode)
+            return True
+        except (IOError, SSHException) as e:
+            self._sftp_unavailable = self._sftp is None
+            self.logger.info(f"SFTP download of {remote_file} failed, retrying over SCP: {e}")
+            return False
+
+    def upload_sftp(self, files: Union[str, List[str]], remote_path: str):
+        """Transfer files to remote host over SFTP, which keeps many write requests in flight
+        instead of SCP's single sequential stream. Faster than upload for many small files.
+
+        Args:
+            files (Union[str, List[str]]): A single path, or a list of paths to be transferred.
+            directories are not supported, use upload with recursive=True for those.
+            remote_path (str): existing directory in which to receive the files on the remote host.
+        """
+        if isinstance(files, str):
+            files = [files]
+        for file in files:
+            # confirm=False: no stat round trip per file to check the remote size
+            self.sftp.put(file, posixpath.join(remote_path, os.path.basename(file)), confirm=False)
+        self.logger.info(f"Finished uploading {len(files)} files to {remote_path} on {self.hostname}")
+
+    def download_sftp(self, remote_files: Union[str, List[str]], local_path: str = ""):
+        """Transfer files from remote host to localhost over SFTP. paramiko prefetches the
+        reads of each file, so several read requests are pipelined per round trip.
+
+        Args:
+            remote_files (Union[str, List[str]]): A single path, or a list of paths to retrieve
+            from remote host. unlike download, these are not evaluated by a shell.
+            local_path (str, optional): existing directory in which to receive files locally.
+            Defaults to ''.
+        """
+        if isinstance(remote_files, str):
+            remote_files = [remote_files]
+        for remote_file in remote_files:
+            self.sftp.get(remote_file, os.path.join(local_path, posixpath.basename(remote_file)))
+        self.logger.info(
+            f"Finished downloading {len(remote_files)} files to {local_path} from {self.hostname}"
+        )
+
+    def download_large(
+        self, remote_path: str, local_path: str, max_concurrent_prefetch_requests: Union[None, int] = None
+    ):
+        """Download one large file over SFTP with prefetch, which keeps many READ requests in
+        flight at once (bounded by the 16 MB channel window) instead of one per round trip.
+
+        Args:
+            remote_path (str): file to retrieve from remote host. not evaluated by a shell.
+            local_path (str): local file to write.
+            max_concurrent_prefetch_requests (Union[None, int], optional): cap on outstanding READ
+            requests. needs paramiko >= 3.3. Defaults to None (no cap).
+        """
+        kwargs = {}
+        if max_concurrent_prefetch_requests is not None:
+            kwargs["max_concurrent_prefetch_requests"] = max_concurrent_prefetch_requests
+        with open(local_path, "wb") as f:
+            size = self.sftp.getfo(remote_path, f, prefetch=True, **kwargs)
+        self.logger.info(f"Finished downloading {size} bytes of {remote_path} from {self.hostname}")
+
+    def upload_large(self, local_path: str, remote_path: str):
+        """Upload one large file over SFTP. paramiko pipelines the WRITE requests; confirm=False
+        skips the stat round trip that checks the remote size afterwards.
+
+        Args:
+            local_path (str): local file to transfer.
+            remote_path (str): remote file to write.
+        """
+        with open(local_path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            self.sftp.putfo(f, remote_path, file_size=file_size, confirm=False)
+        self.logger.info(f"Finished uploading {file_size} bytes to {remote_path} on {self.hostname}")
+
+    def _parallel_scp(self, method: str, paths: List[str], max_workers: int, *args):
+        """Spread paths over up to max_workers SCP channels on the shared transport and run
+        SCPClient.put or SCPClient.get on each share concurrently. Re-raises the first failure."""
+        n_workers = min(max_workers, len(paths))
+        shares = [paths[i::n_workers] for i in range(n_workers)]
+        transport = self.client.get_transport()
+
+        def transfer(share):
+            with SCPClient(transport, buff_size=self.buff_size, socket_timeout=SCP_SOCKET_TIMEOUT) as scp:
+                getattr(scp, method)(share, *args)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(transfer, share) for share in shares]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            raise errors[0]
+
+    def safe_exec_cmd(
+        self,
+        command: str,
+        on_chunk: Union[None, Callable[[bytes], None]] = None,
+        max_bytes: Union[None, int] = None,
+    ) -> Tuple[str, str, int]:
         """Safely read the output (both stdout and stderr) of a command on a remote host
 
         Args:
             command (str): command to be executed on the remote host
+            on_chunk (Union[None, Callable[[bytes], None]], optional): called with each raw stdout
+            chunk as it arrives; stdout is then streamed to it instead of collected. Defaults to None.
+            max_bytes (Union[None, int], optional): keep at most this many bytes of stdout and of
+            stderr. the rest is still read, so the remote command never blocks, but dropped.
+            Defaults to None (no limit).
 
         Returns:
-            Tuple[str, int]: stdout+stderr, and exit code
+            Tuple[str, str, int]: stdout, stderr, and exit code
         """        
         stdin, stdout, stderr = self.client.exec_command(command)
 
@@ -198,39 +510,54 @@ class RemoteClient:
         channel.shutdown_write()
 
         # read stdout/stderr in order to prevent read block hangs
-        stdout_chunks = []
-        stdout_chunks.append(stdout.channel.recv(len(stdout.channel.in_buffer)))
-        # chunked read to prevent stalls
-        while not channel.closed or channel.recv_ready() or channel.recv_stderr_ready():
-            # stop if channel was closed prematurely, and there is no data in the buffers.
-            got_chunk = False
-            readq, _, _ = select.select([stdout.channel], [], [], STDOUT_TIMEOUT)
-            for c in readq:
-                if c.recv_ready():
-                    stdout_chunks.append(stdout.channel.recv(len(c.in_buffer)))
-                    got_chunk = True
-                if c.recv_stderr_ready():
-                    # make sure to read stderr to prevent stall
-                    stderr.channel.recv_stderr(len(c.in_stderr_buffer))
-                    got_chunk = True
-            """
-            1) make sure that there are at least 2 cycles with no data in the input buffers 
-               in order to not exit too early (i.e. cat on a >200k file).
-            2) if no data arrived in the last loop, check if we already received the exit code
-            3) check if input buffers are empty
-            4) exit the loop
-            """
-            if (
-                not got_chunk
-                and stdout.channel.exit_status_ready()
-                and not stderr.channel.recv_stderr_ready()
-                and not stdout.channel.recv_ready()
-            ):
-                # indicate that we're not going to read from this channel anymore
-                stdout.channel.shutdown_read()
-                # close the channel
-                stdout.channel.close()
-                break  # exit as remote side is finished and our bufferes are empty
+        stdout_buf = bytearray()
+        stderr_buf = bytearray()
+        truncated = False
+        # chunked read to prevent stalls. a selector per call, so concurrent commands don't share one
+        with selectors.DefaultSelector() as selector:
+            selector.register(stdout.channel, selectors.EVENT_READ)
+            while not channel.closed or channel.recv_ready() or channel.recv_stderr_ready():
+                # stop if channel was closed prematurely, and there is no data in the buffers.
+                got_chunk = False
+                for key, _ in selector.select(STDOUT_TIMEOUT):
+                    c = key.fileobj
+                    if c.recv_ready():
+                        data = c.recv(RECV_CHUNK_SIZE)
+                        if on_chunk is not None:
+                            on_chunk(data)
+                        elif max_bytes is None or len(stdout_buf) + len(data) <= max_bytes:
+                            stdout_buf.extend(data)
+                        else:
+                            stdout_buf.extend(data[: max(0, max_bytes - len(stdout_buf))])
+                            truncated = True
+                        got_chunk = True
+                    if c.recv_stderr_ready():
+                        # make sure to read stderr to prevent stall
+                        data = c.recv_stderr(RECV_CHUNK_SIZE)
+                        if max_bytes is None or len(stderr_buf) + len(data) <= max_bytes:
+                            stderr_buf.extend(data)
+                        else:
+                            stderr_buf.extend(data[: max(0, max_bytes - len(stderr_buf))])
+                            truncated = True
+                        got_chunk = True
+                """
+                1) make sure that there are at least 2 cycles with no data in the input buffers 
+                   in order to not exit too early (i.e. cat on a >200k file).
+                2) if no data arrived in the last loop, check if we already received the exit code
+                3) check if input buffers are empty
+                4) exit the loop
+                """
+                if (
+                    not got_chunk
+                    and stdout.channel.exit_status_ready()
+                    and not stderr.channel.recv_stderr_ready()
+                    and not stdout.channel.recv_ready()
+                ):
+                    # indicate that we're not going to read from this channel anymore
+                    stdout.channel.shutdown_read()
+                    # close the channel
+                    stdout.channel.close()
+                    break  # exit as remote side is finished and our bufferes are empty
 
         # close all the pseudofiles
         stdout.close()
@@ -240,16 +567,36 @@ class RemoteClient:
 
         del stdin, stdout, stderr
 
-        stdout = "".join([chunk.decode("utf8") for chunk in stdout_chunks])
+        if truncated:
+            self.logger.warning(f"Output of {command!r} on {self.hostname} was cut to {max_bytes} bytes")
+
+        # decode once at the end; a multi-byte character split across two recv calls stays intact
+        stdout = stdout_buf.decode("utf-8", errors="replace")
+        stderr = stderr_buf.decode("utf-8", errors="replace")
 
-        return stdout, exit_code
+        return stdout, stderr, exit_code
 
-    def execute_commands(self, commands: List[str]):
+    def execute_commands(self, commands: List[str], batch: bool = True):
         """Execute multiple commands and print their output in succession.
 
         Args:
             commands (List[str]): List of commands as strings.
+            batch (bool, optional): run all commands through one exec channel instead of one channel
+            per command. each command still runs in its own shell process, so a syntax error, cd or
+            exit in one does not affect the others. Defaults to True.
         """
-        for cmd in commands:
-            stdout, exit_code = self.safe_exec_cmd(cmd)
-            print(stdout)
+        if not batch:
+            for cmd in commands:
+                stdout, _, exit_code = self.safe_exec_cmd(cmd)
+                print(stdout)
+            return
+
+        # a NUL-delimited marker printed between the commands splits the combined output again. each
+        # command is handed quoted to a new instance of the user's shell, the one exec_command uses, so it
+        # is only parsed when it runs and a broken one fails alone
+        script = f"\nprintf '\\0{CMD_SENTINEL_NAME}\\0'\n".join(
+            f'"${{SHELL:-sh}}" -c {shlex.quote(cmd)}' for cmd in commands
+        )
+        stdout, _, exit_code = self.safe_exec_cmd(script)
+        for output in stdout.split(f"\0{CMD_SENTINEL_NAME}\0"):
+            print(output)
@@ -0,0 +1,168 @@
+"""asyncio client for running commands and transferring files on many remote hosts at once."""
+import asyncio
+import logging
+import os
+from typing import *
+
+import asyncssh
+
+
+class AsyncRemoteClient:
+    """Client to interact with a remote host via asyncssh. Same shape as scp_client.RemoteClient,
+    but every session lives on the event loop, so hundreds of hosts cost no threads."""
+
+    def __init__(
+        self,
+        hostname: str,
+        username: Union[None, str] = None,
+        hostport: Union[None, int] = None,
+        password: Union[None, str] = None,
+        ssh_key_filepath: Union[None, str] = None,
+        ssh_config_filepath: Union[None, str] = None,
+        logger: Union[None, logging.Logger] = None,
+        compress: bool = True,
+    ):
+        self.hostname = hostname
+        self.hostport = hostport
+        self.username = username
+        self.password = password
+        self.ssh_key_filepath = ssh_key_filepath
+        self.ssh_config_filepath = ssh_config_filepath
+        self.compress = compress
+        self.conn = None
+        self._sftp = None
+        if logger is None:
+            self.logger = logging.Logger("AsyncRemoteClientLogger", level="INFO")
+        else:
+            self.logger = logger
+
+    async def __aenter__(self) -> "AsyncRemoteClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.disconnect()
+
+    async def connect(self):
+        """Open SSH connection to remote host. User, port, key and ProxyCommand entries of the ssh
+        config apply unless given explicitly here; without a key, asyncssh tries the usual ~/.ssh ones."""
+        kwargs = {
+            # same trust model as RemoteClient's AutoAddPolicy: unknown host keys are accepted
+            "known_hosts": None,
+            "config": [os.path.expanduser(self.ssh_config_filepath)] if self.ssh_config_filepath else (),
+        }
+        if self.hostport is not None:
+            kwargs["port"] = self.hostport
+        if self.username is not None:
+            kwargs["username"] = self.username
+        if self.password is not None:
+            kwargs["password"] = self.password
+        if self.ssh_key_filepath is not None:
+            kwargs["client_keys"] = [self.ssh_key_filepath]
+        if not self.compress:
+            kwargs["compression_algs"] = ["none"]
+        try:
+            self.conn = await asyncssh.connect(self.hostname, **kwargs)
+        except asyncssh.PermissionDenied as e:
+            self.logger.error(f"PermissionDenied occurred; did you remember to generate an SSH key? {e}")
+            raise e
+        except Exception as e:
+            self.logger.error(f"Unexpected error occurred: {e}")
+            raise e
+
+    async def disconnect(self):
+        """Close SFTP session & SSH connection."""
+        if self._sftp is not None:
+            self._sftp.exit()
+            self._sftp = None
+        if self.conn is not None:
+            self.conn.close()
+            await self.conn.wait_closed()
+            self.conn = None
+
+    async def sftp(self) -> asyncssh.SFTPClient:
+        """SFTP session on this connection, started on first use and reused afterwards."""
+        if self._sftp is None:
+            self._sftp = await self.conn.start_sftp_client()
+        return self._sftp
+
+    async def upload(
+        self, files: Union[str, List[str]], remote_path: str, recursive=False, preserve_times=False
+    ):
+        """Transfer files and directories to remote host over SFTP, with pipelined block writes.
+
+        Args:
+            files (Union[str, List[str]]): A single path, or a list of paths to be transferred.
+            local wildcards are expanded. recursive must be True to transfer directories.
+            remote_path (str): path in which to receive the files on the remote host.
+            recursive (bool, optional): transfer files and directories recursively. Defaults to False.
+            preserve_times (bool, optional): preserve mtime and atime of transferred files
+            and directories. Defaults to False.
+        """
+        sftp = await self.sftp()
+        await sftp.mput(files, remote_path, recurse=recursive, preserve=preserve_times)
+        n_files = 1 if isinstance(files, str) else len(files)
+        self.logger.info(f"Finished uploading {n_files} paths to {remote_path} on {self.hostname}")
+
+    async def download(
+        self, remote_path: Union[str, List[str]], local_path: str = "", recursive=False, preserve_times=False
+    ):
+        """Transfer files and directories from remote host to localhost over SFTP, with
+        pipelined block reads.
+
+        Args:
+            remote_path (Union[str, List[str]]): path, or list of paths, to retrieve from remote host.
+            wildcards are expanded by the SFTP client, environment variables are not.
+            local_path (str, optional): path in which to receive files locally. Defaults to ''.
+            recursive (bool, optional): transfer files and directories recursively. Defaults to False.
+            preserve_times (bool, optional): preserve mtime and atime of transferred files
+            and directories. Defaults to False.
+        """
+        sftp = await self.sftp()
+        await sftp.mget(remote_path, local_path or ".", recurse=recursive, preserve=preserve_times)
+        self.logger.info(f"Finished downloading {remote_path} to {local_path} from {self.hostname}")
+
+    async def safe_exec_cmd(self, command: str) -> Tuple[str, str, int]:
+        """Run a command on the remote host and collect its output.
+
+        Args:
+            command (str): command to be executed on the remote host
+
+        Returns:
+            Tuple[str, str, int]: stdout, stderr, and exit code
+        """
+        result = await self.conn.run(command, check=False, encoding="utf-8", errors="replace")
+        return result.stdout, result.stderr, result.exit_status
+
+    async def execute_commands(self, commands: List[str]):
+        """Execute multiple commands and print their output in succession.
+
+        Args:
+            commands (List[str]): List of commands as strings.
+        """
+        for cmd in commands:
+            stdout, _, _ = await self.safe_exec_cmd(cmd)
+            print(stdout)
+
+
+async def fanout_exec(
+    hosts: List[str], cmd: str, **client_kwargs
+) -> Dict[str, Union[Tuple[str, str, int], BaseException]]:
+    """Run one command on every host concurrently.
+
+    Args:
+        hosts (List[str]): hostnames (or ssh config Host aliases) to run the command on.
+        cmd (str): command to be executed on each host.
+        **client_kwargs: passed to every AsyncRemoteClient, e.g. username or ssh_config_filepath.
+
+    Returns:
+        Dict[str, Union[Tuple[str, str, int], BaseException]]: per host, (stdout, stderr, exit code),
+        or the exception that host failed with. one unreachable host does not abort the others.
+    """
+
+    async def run_on(host):
+        async with AsyncRemoteClient(host, **client_kwargs) as client:
+            return await client.safe_exec_cmd(cmd)
+
+    results = await asyncio.gather(*(run_on(host) for host in hosts), return_exceptions=True)
+    return dict(zip(hosts, results))